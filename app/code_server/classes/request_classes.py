@@ -1,82 +1,117 @@
-import sys
-import uuid
-import base64
+import secrets
+import urllib.parse
+try:
+    # pybase64 is API-compatible with the stdlib but dispatches to SIMD codecs
+    import pybase64 as base64
+except ImportError:
+    import base64
 from typing import List
 from datetime import datetime
-from pydantic import BaseModel, Field, field_validator, model_validator, computed_field
+from functools import cached_property
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator, computed_field
 
 
-EXECUTION_ENVS = [
+EXECUTION_ENVS: frozenset[str] = frozenset({
     'python',
     'python_scientific',
     'bash',
     'java',
     'javascript'
-]
+})
 
+MIN_TIMEOUT = 1
+MAX_TIMEOUT = 120
 
-class FileReturn(BaseModel):
-    filename: str = Field(..., description="The name of the file")
-    content: str | bytes = Field(..., description="The (optionally Base64) encoded content of the file")
+MAX_TOTAL_FILE_SIZE = 100 * 1024 * 1024
 
-    @computed_field
-    @property
-    def base64encoded(self) -> bool:
-        if isinstance(self.content, bytes):
-            return True
+_B64_ALPHABET = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=")
 
-        try:
-            base64.b64decode(self.content.encode())
-            return True
 
-        except Exception as e:
-            return False
+def _looks_base64(s: str) -> bool:
+    """Cheap shape check for Base64 content: valid length and a clean prefix.
 
-    @model_validator(mode='after')
-    def check_content(self) -> 'FileReturn':
-        if isinstance(self.content, bytes):
-            try:
-                self.content = base64.b64encode(self.content).decode('utf-8')
-            except Exception as e:
-                raise ValueError(f"Unable to Base64 encode content: {e}")
-        else:
-            self.content = str(self.content)
+    Only the first 64 characters are inspected, so the cost is O(1) in the
+    payload size rather than a full decode.
+    """
+    return len(s) % 4 == 0 and s != "" and all(c in _B64_ALPHABET for c in s[:64])
 
-        return self
+
+def _b64_decoded_len(s: str) -> int:
+    """Compute the decoded size of a Base64 string without decoding it.
+
+    Base64 expands 3 input bytes to 4 output characters, so the decoded
+    length follows directly from the string length and its padding.
+    """
+    n = len(s)
+    pad = s.count('=', max(0, n - 2))
+    return (n // 4) * 3 - pad
+
+
+class FileReturn(BaseModel):
+    filename: str = Field(..., description="The name of the file")
+    content: str = Field(..., description="The (optionally Base64) encoded content of the file")
+    base64encoded: bool = Field(default=False, description="Whether the content is Base64 encoded")
+
+    @model_validator(mode='before')
+    @classmethod
+    def check_content(cls, data):
+        # Normalize content on the raw input so no post-init mutation (and
+        # therefore no second validation pass) is needed
+        if isinstance(data, dict):
+            content = data.get('content')
+            if isinstance(content, (bytes, bytearray, memoryview)):
+                try:
+                    data['content'] = base64.b64encode(content).decode('ascii')
+                except Exception as e:
+                    raise ValueError(f"Unable to Base64 encode content: {e}")
+                data['base64encoded'] = True
+            elif isinstance(content, str):
+                data.setdefault('base64encoded', _looks_base64(content))
+            elif content is not None:
+                data['content'] = str(content)
+                data['base64encoded'] = False
+
+        return data
 
 
 class FileUpload(BaseModel):
+    model_config = ConfigDict(ignored_types=(cached_property,))
+
     filename: str = Field(..., description="The name of the file")
     extension: str = Field(..., description="The extension of the file")
     content: str = Field(..., description="The(optionally Base64) encoded content of the file")
     base64encoded: bool = Field(..., description="Whether the content is Base64 encoded")
+    file_id: str = Field(default_factory=lambda: secrets.token_hex(16),
+                         description="Unique identifier for the file")
 
-    @computed_field
-    @property
-    def file_id(self) -> str:
-        return uuid.uuid4().hex
-
-    @computed_field
-    @property
+    @cached_property
     def decoded_content(self) -> bytes:
         if self.base64encoded:
             try:
-                return base64.b64decode(self.content.encode())
+                # b64decode accepts str and does the ASCII conversion in C,
+                # so the intermediate .encode() copy is redundant
+                return base64.b64decode(self.content)
             except Exception as e:
                 raise ValueError(f"Invalid Base64 content: {e}")
         else:
             return self.content.encode()
 
-    @computed_field
-    @property
+    @cached_property
     def file_size(self) -> int:
-        return sys.getsizeof(self.decoded_content)
+        return len(self.decoded_content)
 
-    @computed_field
-    @property
+    @cached_property
     def full_filename(self) -> str:
         return f"{self.filename}.{self.extension}"
 
+    @cached_property
+    def safe_filename(self) -> str:
+        return urllib.parse.quote(self.filename, safe="")
+
+    @cached_property
+    def safe_extension(self) -> str:
+        return urllib.parse.quote(self.extension, safe="")
+
 
 class CodeRequest(BaseModel):
     code: str = Field(..., description="The python code to be executed")
@@ -85,24 +120,21 @@ class CodeRequest(BaseModel):
     execution_environment: str | None = Field(default='python', description="The execution environment to use for the code execution")
     packages: List[str] | None = Field(None, description="Optional list of packages to be installed in the execution environment")
     user: str = Field(..., description="The user who is executing the code")
+    request_id: str = Field(default_factory=lambda: secrets.token_hex(16),
+                            description="Unique identifier for the request")
 
     @computed_field
     @property
     def request_date(self) -> str:
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    @computed_field
-    @property
-    def request_id(self) -> str:
-        return uuid.uuid4().hex
-
     @field_validator('timeout')
     def check_timeout(cls, v):
-        if v <= 1:
-            raise ValueError("Timeout must be greater than 1")
+        if v <= MIN_TIMEOUT:
+            raise ValueError(f"Timeout must be greater than {MIN_TIMEOUT}")
 
-        if v > 120:
-            raise ValueError("Timeout must be less than 120")
+        if v > MAX_TIMEOUT:
+            raise ValueError(f"Timeout must be less than {MAX_TIMEOUT}")
 
         return v
 
@@ -111,38 +143,46 @@ class CodeRequest(BaseModel):
         if v is None:
             return v
 
-        if not isinstance(v, list):
-            raise ValueError("Files must be a list")
-
-        if len(v) == 0:
+        if not v:
             raise ValueError("Files must not be empty")
 
-        if isinstance(v, list):
-            total_size = 0
-            for file in v:
-                if not isinstance(file, FileUpload):
-                    raise ValueError("Files must be FileUpload objects")
-                total_size += file.file_size
-
-            if total_size > 100 * 1024 * 1024:
+        # Accumulate decoded sizes and reject as soon as the cap is crossed,
+        # so an oversize request fails on its first offending file. Pydantic
+        # has already coerced every item to a FileUpload at this point.
+        total_size = 0
+        for file in v:
+            if file.base64encoded:
+                total_size += _b64_decoded_len(file.content)
+            else:
+                total_size += len(file.content)
+
+            if total_size > MAX_TOTAL_FILE_SIZE:
                 raise ValueError("Total size of files must not exceed 100MB")
 
         return v
 
     @model_validator(mode='after')
     def check_environment(self) -> 'CodeRequest':
-        if self.execution_environment is None:
+        env = self.execution_environment
+        if env is None:
             raise ValueError("Execution environment must be specified")
-        else:
-            self.execution_environment = self.execution_environment.lower()
 
-        if self.execution_environment not in EXECUTION_ENVS:
-            raise ValueError(f"Invalid execution environment: {self.execution_environment}")
+        # Skip the lowercase copy when the value is already lowercase
+        if not env.islower():
+            env = env.lower()
 
+        if env not in EXECUTION_ENVS:
+            raise ValueError(f"Invalid execution environment: {env}")
+
+        self.execution_environment = env
         return self
 
 
 class CodeResponse(BaseModel):
+    # Serialize any bytes payload through pydantic-core's Rust base64 encoder
+    # rather than a Python-level pass
+    model_config = ConfigDict(ser_json_bytes='base64')
+
     output: str | None = Field(..., description="The standard output of the code execution")
     error: str | bool | None = Field(..., description="The standard error of the code execution")
     timedout: bool = Field(..., description="Whether the code execution timed out")
@@ -1,9 +1,16 @@
-from jupyter_client import KernelManager, run_kernel
+from jupyter_client import KernelManager
 from jupyter_client.kernelspec import KernelSpecManager
 import threading
 import re
 import os
-import base64
+import time
+import json
+import asyncio
+import shlex
+import queue
+import shutil
+import hashlib
+import tempfile
 import logging
 import traceback
 from queue import Empty
@@ -13,13 +20,112 @@ from typing import List
 logger = logging.getLogger(__name__)
 
 
+# ANSI color escapes in kernel tracebacks. The explicit character class is
+# deterministic, so the scan never backtracks the way the non-greedy .*? did.
+_ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def _clean_dict(i: dict, append) -> None:
+    v = i.get("text/plain")
+    if v is not None:
+        append(v)
+
+
+def _clean_str(i: str, append) -> None:
+    append(i)
+
+
+def _clean_list(i: list, append) -> None:
+    append(_ANSI_RE.sub("", "\n".join(i)))
+
+
+# Type-keyed handler dispatch for clean_output: one hash lookup on type(i)
+# instead of a cascaded comparison chain per message.
+_OUTPUT_DISPATCH = {
+    dict: _clean_dict,
+    str: _clean_str,
+    list: _clean_list,
+}
+
+
+# Warm kernels kept alive between requests, keyed by kernel name. Starting a
+# kernel costs 0.5-3s of process spawn and imports, which dominates short code
+# executions; reusing a reset kernel amortizes that across requests.
+_KERNEL_POOL: dict[str, queue.Queue] = {}
+_POOL_LOCK = threading.Lock()
+_POOL_MAX_PER_KERNEL = 4
+
+# Cell run against a pooled python kernel before it is reused
+_RESET_CELL = "%reset -f\nimport gc\ngc.collect()"
+
+
+def _pool_for(kernel_name: str) -> queue.Queue:
+    """Return the warm-kernel queue for a kernel name, creating it if needed."""
+    with _POOL_LOCK:
+        pool = _KERNEL_POOL.get(kernel_name)
+        if pool is None:
+            pool = _KERNEL_POOL[kernel_name] = queue.Queue(maxsize=_POOL_MAX_PER_KERNEL)
+        return pool
+
+
+def _start_kernel(kernel_name: str):
+    """Start a fresh kernel with its own scratch working directory.
+
+    Args:
+        kernel_name (str): Name of the kernelspec to launch.
+
+    Returns:
+        tuple: (KernelManager, kernel client, scratch directory path)
+    """
+    scratch = tempfile.mkdtemp(prefix="jupyter-scratch-")
+    km = KernelManager(kernel_name=kernel_name)
+    km.start_kernel(cwd=scratch)
+    kc = km.client()
+    kc.start_channels()
+    kc.wait_for_ready(timeout=60)
+    return km, kc, scratch
+
+
+def _shutdown_kernel(km, kc, scratch):
+    """Tear down a kernel, its channels, and its scratch directory."""
+    try:
+        kc.stop_channels()
+    except Exception:
+        pass
+    try:
+        km.shutdown_kernel(now=True)
+    except Exception:
+        pass
+    shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _clear_dir(path: str):
+    """Remove the contents of a directory without removing the directory itself."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
 class JupyterKernels:
     """A class to manage Jupyter kernels and their specifications.
 
     This class provides functionality to retrieve and store information about available
-    Jupyter kernels, including their display names and supported languages.
+    Jupyter kernels, including their display names and supported languages. The spec
+    lookup walks the filesystem and parses every kernel.json, so the result is cached
+    at class level with a TTL rather than recomputed per instance.
     """
 
+    _specs_lock = threading.Lock()
+    _specs_cache: dict | None = None
+    _specs_cached_at: float = 0.0
+    _SPECS_TTL_S = 300.0
+
     def __init__(self):
         """Initialize the JupyterKernels instance.
 
@@ -27,13 +133,38 @@ class JupyterKernels:
         with information about all available kernels.
         """
         self.ksm = KernelSpecManager()
-        self.ks = {}
-        all_specs = self.ksm.get_all_specs()
-        for ks in all_specs:
-            self.ks[ks] = {
-                "display_name": all_specs[ks]["spec"]["display_name"],
-                "language": all_specs[ks]["spec"]["language"]
-            }
+        self.ks = self._load_specs(self.ksm)
+        # Client-facing view with the base python3 kernel filtered out,
+        # computed once instead of per request, plus its ETag so conditional
+        # GETs can be answered without hashing the body again
+        self.ks_public = {k: v for k, v in self.ks.items() if k != "python3"}
+        self.ks_public_etag = hashlib.blake2b(
+            json.dumps(self.ks_public, sort_keys=True).encode(), digest_size=16
+        ).hexdigest()
+
+    @classmethod
+    def _load_specs(cls, ksm: KernelSpecManager) -> dict:
+        """Return the kernel spec summary dict, refreshing the shared cache if stale.
+
+        Args:
+            ksm (KernelSpecManager): Manager used to fetch specs on a cache miss.
+
+        Returns:
+            dict: Mapping of kernel name to display name and language.
+        """
+        now = time.monotonic()
+        with cls._specs_lock:
+            if cls._specs_cache is None or now - cls._specs_cached_at > cls._SPECS_TTL_S:
+                all_specs = ksm.get_all_specs()
+                cls._specs_cache = {
+                    ks: {
+                        "display_name": all_specs[ks]["spec"]["display_name"],
+                        "language": all_specs[ks]["spec"]["language"]
+                    }
+                    for ks in all_specs
+                }
+                cls._specs_cached_at = now
+            return cls._specs_cache
 
 
 class JupyterNotebook:
@@ -41,6 +172,10 @@ class JupyterNotebook:
 
     This class provides functionality to execute code cells, manage kernels,
     handle outputs, and manage files generated during execution.
+
+    Python-family kernels are checked out of a warm pool when available and
+    returned to it via release(); other kernels are started fresh and shut
+    down on release, since they offer no reliable namespace reset.
     """
 
     def __init__(self, kernel_name: str = "python3"):
@@ -49,8 +184,67 @@ class JupyterNotebook:
         Args:
             kernel_name (str, optional): Name of the kernel to use. Defaults to "python3".
         """
-        self.kc = run_kernel(kernel_name=kernel_name).gen
-        self.km = next(self.kc)
+        self.kernel_name = kernel_name
+        lowered = kernel_name.lower()
+        if 'python' in lowered:
+            self.family = 'python'
+        elif 'javascript' in lowered:
+            self.family = 'javascript'
+        else:
+            self.family = None
+        self.poolable = self.family == 'python'
+
+        km = kc = scratch = None
+        if self.poolable:
+            pool = _pool_for(kernel_name)
+            while True:
+                try:
+                    km, kc, scratch = pool.get_nowait()
+                except queue.Empty:
+                    km = kc = scratch = None
+                    break
+                if kc.is_alive():
+                    break
+                # Stale pool entry: discard and try the next one
+                _shutdown_kernel(km, kc, scratch)
+                km = kc = scratch = None
+
+        if km is None:
+            km, kc, scratch = _start_kernel(kernel_name)
+
+        self.km = km
+        self.kc = kc
+        self.scratch = scratch
+        self.last_timedout = False
+
+    def release(self):
+        """Return this kernel to the warm pool, or shut it down.
+
+        Pooled kernels get their namespace reset and scratch directory
+        cleared before being re-enqueued. A kernel whose last cell timed out
+        is interrupted first so the reset can run, and if the reset itself
+        errors or times out the kernel is shut down instead of being
+        re-enqueued with user code still executing. Kernels that cannot be
+        reset (or a full pool) are shut down as well.
+        """
+        if self.poolable and self.kc.is_alive():
+            try:
+                if self.last_timedout:
+                    # The timed-out cell is still running; interrupt it so
+                    # the reset below gets a chance to execute
+                    self.km.interrupt_kernel()
+                _clear_dir(self.scratch)
+                _, reset_error, _, reset_timedout = self.run_cell(_RESET_CELL, timeout=10)
+                if not reset_error and not reset_timedout:
+                    _pool_for(self.kernel_name).put_nowait((self.km, self.kc, self.scratch))
+                    return
+            except Exception:
+                pass
+        self.shutdown()
+
+    def shutdown(self):
+        """Shut down the kernel and remove its scratch directory."""
+        _shutdown_kernel(self.km, self.kc, self.scratch)
 
     def clean_output(self, outputs: List[str | list | dict]):
         """Clean and format the output from code execution.
@@ -62,77 +256,77 @@ class JupyterNotebook:
             str: A cleaned string representation of the outputs.
         """
         outputs_only_str = list()
+        append = outputs_only_str.append
         for i in outputs:
-            if type(i) == dict:
-                if "text/plain" in list(i.keys()):
-                    outputs_only_str.append(i["text/plain"])
-            elif type(i) == str:
-                outputs_only_str.append(i)
-            elif type(i) == list:
-                error_msg = "\n".join(i)
-                error_msg = re.sub(r"\x1b\[.*?m", "", error_msg)
-                outputs_only_str.append(error_msg)
+            handler = _OUTPUT_DISPATCH.get(type(i))
+            if handler is not None:
+                handler(i, append)
 
         return "\n".join(outputs_only_str).strip()
 
     def get_files(self):
-        """Get and encode files generated during code execution.
+        """List files generated during code execution.
 
-        Reads all files in the current working directory, encodes them in base64,
-        and removes them after reading.
+        The bytes stay on disk in the kernel's scratch working directory so
+        callers can copy them with a zero-copy kernel path instead of shipping
+        base64 text through the response. The scratch directory is cleared
+        when the notebook is released.
 
         Returns:
-            list: List of dictionaries containing file names and their base64-encoded content.
+            list: List of dictionaries containing file names and their absolute paths.
         """
-        files = os.listdir(os.getcwd())
-        logger.debug(f"Files: {files}")
-        content = []
-        for file in files:
-            file_path = os.path.join(os.getcwd(), file)
-            if os.path.isfile(file_path):
-                with open(file_path, "rb") as image_file:
-                    encoded_string = base64.b64encode(image_file.read())
-                    content.append({"file": file, "content": encoded_string.decode()})
-                os.remove(file_path)
-        logger.debug(f"Content: {content}")
-        return content
+        files = []
+        with os.scandir(self.scratch) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    files.append({"file": entry.name, "path": entry.path})
+        logger.debug(f"Files: {[f['file'] for f in files]}")
+        return files
 
     def install_python_packages(self, packages: List[str], timeout: int = 10):
         """Install Python packages using pip.
 
+        All packages are installed in a single pip invocation so the resolver
+        and index metadata fetch are paid once instead of per package.
+
         Args:
             packages (list): List of package names to install.
-            timeout (int, optional): Timeout in seconds for each package installation. Defaults to 10.
+            timeout (int, optional): Timeout in seconds per package; the batched install
+                gets the combined budget. Defaults to 10.
 
         Returns:
             tuple: (Success status, Timeout flag, Error message) or None if successful.
         """
-        for package in packages:
-            try:
-                resp = self.run_cell(f"!pip install {package}", timeout=timeout)
-                if resp[1]:
-                    return True, False, resp[1]
-            except Empty:
-                return True, True, "Package Install Timeout"
+        try:
+            pkgs = " ".join(shlex.quote(p) for p in packages)
+            resp = self.run_cell(f"!pip install --no-input {pkgs}", timeout=timeout * len(packages))
+            if resp[1]:
+                return True, False, resp[1]
+        except Empty:
+            return True, True, "Package Install Timeout"
         return None
 
     def install_npm_packages(self, packages: List[str], timeout: int = 30):
         """Install JavaScript packages using npm.
 
+        All packages are installed in a single npm invocation so the registry
+        metadata fetch and process startup are paid once instead of per package.
+
         Args:
             packages (list): List of package names to install.
-            timeout (int, optional): Timeout in seconds for each package installation. Defaults to 30.
+            timeout (int, optional): Timeout in seconds per package; the batched install
+                gets the combined budget. Defaults to 30.
 
         Returns:
             tuple: (Success status, Timeout flag, Error message) or None if successful.
         """
-        for package in packages:
-            try:
-                resp = self.run_cell(f"!npm install {package}", timeout=timeout)
-                if resp[1]:
-                    return True, False, resp[1]
-            except Empty:
-                return True, True, f"Timeout installing package {package}"
+        try:
+            pkgs = " ".join(shlex.quote(p) for p in packages)
+            resp = self.run_cell(f"!npm install {pkgs}", timeout=timeout * len(packages))
+            if resp[1]:
+                return True, False, resp[1]
+        except Empty:
+            return True, True, f"Timeout installing packages {', '.join(packages)}"
         return None
 
     def run_cell(self, code_string: str, timeout: int = 10):
@@ -140,7 +334,7 @@ class JupyterNotebook:
 
         Args:
             code_string (str): The code to execute.
-            timeout (int, optional): Timeout in seconds for cell execution. Defaults to 10.
+            timeout (int, optional): Overall timeout in seconds for cell execution. Defaults to 10.
 
         Returns:
             tuple: (Cleaned output, Error flag, Generated files, Timeout flag)
@@ -149,28 +343,17 @@ class JupyterNotebook:
         outputs = []
         error_flag = False
         timeout_flag = False
-        # client = next(self.kc)
-        client = self.km
+        client = self.kc
         msg_id = client.execute(code_string)
 
-        while True:
-            try:
-                msg = client.get_iopub_msg(timeout=timeout)
-
-                msg_type = msg["header"]["msg_type"]
-                content = msg["content"]
-
-                if msg_type == "execute_result":
-                    outputs.append(content["data"])
-                elif msg_type == "stream":
-                    outputs.append(content["text"])
-                elif msg_type == "error":
-                    error_flag = True
-                    outputs.append(content["traceback"])
+        # Treat the timeout as an overall deadline for the whole cell rather
+        # than a per-message budget.
+        deadline = time.monotonic() + timeout
+        finished = False
 
-                # If the execution state of the kernel is idle, it means the cell finished executing
-                if msg_type == "status" and content["execution_state"] == "idle":
-                    break
+        while not finished:
+            try:
+                msg = client.get_iopub_msg(timeout=max(0.0, deadline - time.monotonic()))
             except Empty:
                 outputs.append("Timeout waiting for cell execution")
                 error_flag = True
@@ -180,4 +363,95 @@ class JupyterNotebook:
                 logging.error(traceback.format_exc())
                 break
 
-        return self.clean_output(outputs), error_flag, self.get_files(), timeout_flag
\ No newline at end of file
+            while True:
+                # Only consume replies to this execute request: on a pooled
+                # kernel the iopub channel can still carry output from a
+                # previous cell, which must not leak into this response.
+                if msg["parent_header"].get("msg_id") == msg_id:
+                    msg_type = msg["header"]["msg_type"]
+                    content = msg["content"]
+
+                    if msg_type == "execute_result":
+                        outputs.append(content["data"])
+                    elif msg_type == "stream":
+                        outputs.append(content["text"])
+                    elif msg_type == "error":
+                        error_flag = True
+                        outputs.append(content["traceback"])
+
+                    # If the execution state of the kernel is idle, it means the cell finished executing
+                    if msg_type == "status" and content["execution_state"] == "idle":
+                        finished = True
+                        break
+
+                # Drain any messages already queued on the channel before
+                # paying for another blocking poll.
+                try:
+                    msg = client.get_iopub_msg(timeout=0)
+                except Empty:
+                    break
+
+        self.last_timedout = timeout_flag
+        return self.clean_output(outputs), error_flag, self.get_files(), timeout_flag
+
+# Package installers keyed by kernel family; families without an entry do
+# not support installing additional packages
+INSTALLERS = {
+    'python': JupyterNotebook.install_python_packages,
+    'javascript': JupyterNotebook.install_npm_packages,
+}
+
+
+class KernelPool:
+    """Async facade over the warm-kernel pool for use from request handlers.
+
+    Bounds the number of concurrently live kernels per kernel name with a
+    semaphore, and runs kernel checkout and release (both of which can block
+    on process startup or a reset cell) off the event loop.
+    """
+
+    def __init__(self, max_per_kernel: int = _POOL_MAX_PER_KERNEL):
+        """Initialize the KernelPool.
+
+        Args:
+            max_per_kernel (int, optional): Maximum concurrently live kernels
+                per kernel name. Defaults to the warm pool size.
+        """
+        self._max = max_per_kernel
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def _sem_for(self, kernel_name: str) -> asyncio.Semaphore:
+        """Return the concurrency semaphore for a kernel name, creating it if needed."""
+        with self._lock:
+            sem = self._semaphores.get(kernel_name)
+            if sem is None:
+                sem = self._semaphores[kernel_name] = asyncio.Semaphore(self._max)
+            return sem
+
+    async def acquire(self, kernel_name: str) -> JupyterNotebook:
+        """Check a notebook out of the pool, starting a kernel if none is warm.
+
+        Args:
+            kernel_name (str): Name of the kernelspec to use.
+
+        Returns:
+            JupyterNotebook: A ready-to-use notebook.
+        """
+        await self._sem_for(kernel_name).acquire()
+        try:
+            return await asyncio.to_thread(JupyterNotebook, kernel_name)
+        except BaseException:
+            self._sem_for(kernel_name).release()
+            raise
+
+    async def release(self, nb: JupyterNotebook):
+        """Return a notebook to the pool (or shut it down) and free its slot.
+
+        Args:
+            nb (JupyterNotebook): The notebook obtained from acquire().
+        """
+        try:
+            await asyncio.to_thread(nb.release)
+        finally:
+            self._sem_for(nb.kernel_name).release()
@@ -1,4 +1,7 @@
+import time
+import hashlib
 import logging
+import threading
 from fastapi import Security
 from fastapi.security import APIKeyHeader
 
@@ -10,16 +13,61 @@ api_key_header = APIKeyHeader(name="X-API-Key", scheme_name="API Key")
 application_header = APIKeyHeader(name="X-Application", scheme_name="Application")
 
 
+# Resolved users cached by (api-key digest, application) with a TTL: the
+# digest keeps raw credentials out of process memory, and expiry means a
+# revoked key stops resolving within the TTL instead of never.
+_USER_CACHE: dict[tuple[str, str], tuple[float, str]] = {}
+_USER_CACHE_LOCK = threading.Lock()
+_USER_CACHE_TTL_S = 300.0
+_USER_CACHE_MAX = 4096
+
+
+def _resolve_user(api_key: str, application: str) -> str:
+    """
+    Resolve the credentials from the request headers to a user.
+
+    Dummy implementation for example purposes that always returns
+    'example_user'. A real implementation (key parsing, database lookup,
+    etc.) only pays its cost once per credential set and TTL window thanks
+    to the cache in get_user.
+
+    Args:
+        api_key: API key from request header
+        application: Application name from request header
+
+    Returns:
+        str: A fixed username for demonstration
+    """
+    return "example_user"
+
+
 def get_user(api_key_head: str = Security(api_key_header), application_head: str = Security(application_header)):
     """
     Dummy implementation for example purposes.
     Always returns 'example_user' regardless of the input credentials.
-    
+
     Args:
         api_key_head: API key from request header
         application_head: Application name from request header
-        
+
     Returns:
         str: A fixed username for demonstration
     """
-    return "example_user"
\ No newline at end of file
+    digest = hashlib.blake2b(api_key_head.encode(), digest_size=16).hexdigest()
+    key = (digest, application_head)
+    now = time.monotonic()
+
+    with _USER_CACHE_LOCK:
+        hit = _USER_CACHE.get(key)
+        if hit is not None and now - hit[0] < _USER_CACHE_TTL_S:
+            return hit[1]
+
+    user = _resolve_user(api_key_head, application_head)
+
+    with _USER_CACHE_LOCK:
+        if len(_USER_CACHE) >= _USER_CACHE_MAX:
+            # Evict the oldest insertion to bound memory
+            _USER_CACHE.pop(next(iter(_USER_CACHE)), None)
+        _USER_CACHE[key] = (now, user)
+
+    return user
@@ -1,17 +1,106 @@
 import os
+import mmap
+import time
+import heapq
+import shutil
 import asyncio
-from datetime import datetime, timedelta
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
+try:
+    # watchfiles drives expiry from inotify/FSEvents; fall back to polling
+    # when it is not installed
+    from watchfiles import Change, awatch
+except ImportError:
+    awatch = None
+
+
+logger = logging.getLogger(__name__)
+
 
 FILES_DIR = "/files"
 os.makedirs(FILES_DIR, exist_ok=True)
 
+SHORT_LIFETIME_S = 20 * 60       # regular files live for 20 minutes
+LONG_LIFETIME_S = 2880 * 60      # '-long' files live for 48 hours
 
-async def _cleanup_old_files():
+
+def copy_result_file(src: str, dst: str):
+    """Copy a kernel result file into the served files directory.
+
+    Uses os.sendfile so the bytes move kernel-to-kernel without ever being
+    materialized as a Python object; falls back to shutil.copyfile on
+    platforms without sendfile.
+
+    Args:
+        src (str): Absolute path of the source file.
+        dst (str): Absolute path of the destination file.
+    """
+    if not hasattr(os, "sendfile"):
+        shutil.copyfile(src, dst)
+        return
+
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        size = os.fstat(src_fd).st_size
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+
+# Below this size a plain buffered write is faster than setting up a mapping
+MMAP_WRITE_THRESHOLD = 8 * 1024 * 1024
+
+
+def write_upload(path: str, data: bytes):
+    """Write an upload payload to disk in one shot.
+
+    Large payloads are written through an mmap'd view of the pre-sized file,
+    which copies the bytes straight into the page cache instead of going
+    through the buffered-io layer; small payloads use a plain write, which
+    wins below the threshold.
+
+    Args:
+        path (str): Absolute path of the destination file.
+        data (bytes): The payload to write.
     """
-    Continuously monitors and removes old files from the FILES_DIR directory.
+    size = len(data)
+    if size < MMAP_WRITE_THRESHOLD:
+        with open(path, "wb") as f:
+            f.write(data)
+        return
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.ftruncate(fd, size)
+        mm = mmap.mmap(fd, size)
+        try:
+            mm[:] = memoryview(data)
+            mm.flush()
+        finally:
+            mm.close()
+    finally:
+        os.close(fd)
+
+
+def _expiry_for(name: str, mtime: float) -> float:
+    """Return the absolute expiry timestamp for a file based on its name."""
+    return mtime + (LONG_LIFETIME_S if '-long' in name else SHORT_LIFETIME_S)
+
+
+async def _poll_cleanup_old_files():
+    """
+    Polling fallback that removes old files from the FILES_DIR directory.
 
     Files containing '-long' in their name have a lifetime of 48 hours (2880 minutes),
     while other files have a lifetime of 20 minutes. The function runs every minute
@@ -21,25 +110,103 @@ async def _cleanup_old_files():
     """
     while True:
         await asyncio.sleep(60)  # run every minute
-        now = datetime.utcnow()
-        for fname in os.listdir(FILES_DIR):
-            if '-long' in fname:
-                lt = 2880
-            else:
-                lt = 20
-
-            path = os.path.join(FILES_DIR, fname)
-            if not os.path.isfile(path):
-                continue
-            # Use modification time to decide age
-            mtime = datetime.fromtimestamp(os.path.getmtime(path))
-            if now - mtime > timedelta(minutes=lt):
+        now = time.time()
+        cutoff_short = now - SHORT_LIFETIME_S
+        cutoff_long = now - LONG_LIFETIME_S
+        with os.scandir(FILES_DIR) as entries:
+            for entry in entries:
+                cutoff = cutoff_long if '-long' in entry.name else cutoff_short
                 try:
-                    os.remove(path)
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    # Use modification time to decide age
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
                 except OSError:
                     pass
 
 
+async def _cleanup_old_files():
+    """
+    Removes files from FILES_DIR once their lifetime expires.
+
+    Expiry is driven by filesystem events: a watcher pushes (expiry, path)
+    entries onto a min-heap as files appear, and the main loop sleeps until
+    the earliest expiry instead of rescanning the directory every minute.
+    Files present at startup are seeded into the heap with a single scan.
+
+    Falls back to the minute-interval polling sweep when watchfiles is not
+    installed. Runs indefinitely until cancelled.
+    """
+    if awatch is None:
+        await _poll_cleanup_old_files()
+        return
+
+    heap: list[tuple[float, str]] = []
+    new_entry = asyncio.Event()
+
+    # Seed with files already present at startup
+    with os.scandir(FILES_DIR) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    heapq.heappush(heap, (_expiry_for(entry.name, entry.stat().st_mtime), entry.path))
+            except OSError:
+                pass
+
+    async def _watch():
+        async for changes in awatch(FILES_DIR):
+            for change, path in changes:
+                if change == Change.deleted:
+                    continue
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                heapq.heappush(heap, (_expiry_for(os.path.basename(path), mtime), path))
+            new_entry.set()
+
+    watcher = asyncio.create_task(_watch())
+    # Wake the main loop when the watcher exits for any reason, so a dead
+    # watcher cannot leave it blocked on new_entry forever
+    watcher.add_done_callback(lambda _task: new_entry.set())
+    try:
+        while True:
+            if watcher.done() and not watcher.cancelled():
+                # e.g. inotify watch-limit exhaustion; without events the
+                # heap would never be fed again, so degrade to the sweep
+                logger.warning(
+                    "Files watcher stopped (%s); falling back to the polling sweep",
+                    watcher.exception()
+                )
+                await _poll_cleanup_old_files()
+                return
+
+            if not heap:
+                await new_entry.wait()
+                new_entry.clear()
+                continue
+
+            delay = heap[0][0] - time.time()
+            if delay > 0:
+                # Sleep until the earliest expiry, waking early if a new
+                # file shows up with a shorter lifetime
+                try:
+                    await asyncio.wait_for(new_entry.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                new_entry.clear()
+                continue
+
+            _, path = heapq.heappop(heap)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    finally:
+        watcher.cancel()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -4,6 +4,15 @@ import logging
 from loguru import logger
 
 
+# Caller depth per log call-site, so the frame walk in InterceptHandler.emit
+# runs once per site instead of on every record.
+_DEPTH_CACHE: dict[tuple[str, str, int], int] = {}
+
+# Numeric level of the configured Loguru sink; records below it are dropped
+# in emit before any formatting work. Set by configure_logging.
+_MIN_LEVEL_NO = logging.INFO
+
+
 class InterceptHandler(logging.Handler):
     """
     Custom logging handler that intercepts standard logging and redirects to Loguru.
@@ -24,27 +33,38 @@ class InterceptHandler(logging.Handler):
         The method determines the appropriate log level, finds the original caller's frame,
         and forwards the log message to Loguru with proper context and formatting.
         """
+        # Drop below-threshold records before paying for message formatting
+        # or the caller-depth lookup.
+        if record.levelno < _MIN_LEVEL_NO:
+            return
+
         # Get corresponding Loguru level if it exists.
         try:
             level: str | int = logger.level(record.levelname).name
         except ValueError:
             level = record.levelno
 
-        # Find caller from where originated the logged message.
-        frame, depth = inspect.currentframe(), 0
-        while frame:
-            filename = frame.f_code.co_filename
-            is_logging = filename == logging.__file__
-            is_frozen = "importlib" in filename and "_bootstrap" in filename
-            if depth > 0 and not (is_logging or is_frozen):
-                break
-            frame = frame.f_back
-            depth += 1
+        # Find caller from where originated the logged message. The walk is
+        # cached per call-site since the path through the logging machinery
+        # is fixed for a given site.
+        cache_key = (record.name, record.funcName, record.lineno)
+        depth = _DEPTH_CACHE.get(cache_key)
+        if depth is None:
+            frame, depth = inspect.currentframe(), 0
+            while frame:
+                filename = frame.f_code.co_filename
+                is_logging = filename == logging.__file__
+                is_frozen = "importlib" in filename and "_bootstrap" in filename
+                if depth > 0 and not (is_logging or is_frozen):
+                    break
+                frame = frame.f_back
+                depth += 1
+            _DEPTH_CACHE[cache_key] = depth
 
         logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
 
 
-def configure_logging():
+def configure_logging(level: str = "INFO"):
     """
     Configure the logging system with custom formatting and handlers.
 
@@ -52,13 +72,19 @@ def configure_logging():
     and source location. Also configures the standard logging to use the InterceptHandler
     for consistent logging behavior across the application.
 
+    Args:
+        level (str, optional): Minimum level emitted by the sink. Defaults to "INFO".
+
     Returns:
         None
     """
+    global _MIN_LEVEL_NO
+
     logger.remove()
     logger.add(sys.stdout, colorize=True,
                format="<green>{time}</green> :: <level>{level}</level> :: <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-               level="INFO")
+               level=level)
+    _MIN_LEVEL_NO = logger.level(level).no
     logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
 
 
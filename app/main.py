@@ -1,19 +1,20 @@
 import os
-import base64
-import tempfile
+import asyncio
 import traceback
 import urllib.parse
-from uuid import uuid4
-from datetime import datetime
+import secrets
+import aiofiles
 from dotenv import load_dotenv
 from fastapi_mcp import FastApiMCP
-from fastapi import FastAPI, Request, Depends, HTTPException
+from fastapi import FastAPI, Request, Response, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from code_server.utils import logger_setup
 from code_server.utils.auth import get_user
-from code_server.utils.file_utils import lifespan, FILES_DIR
+from code_server.utils.file_utils import lifespan, copy_result_file, write_upload, FILES_DIR
 from code_server.classes import request_classes
-from code_server.jupyter.JupyterClient import JupyterNotebook, JupyterKernels
+from code_server.jupyter.JupyterClient import JupyterKernels, KernelPool, INSTALLERS
 
 
 logger_setup.configure_logging()
@@ -26,6 +27,18 @@ load_dotenv()
 HOST = "127.0.0.1"
 PORT = "8080"
 
+# Log banner built once instead of per request
+BANNER = "#" * 40
+
+# Public URL prefix for served files, built once; per-file URLs become a
+# single string concatenation instead of an f-string over four parts
+URL_PREFIX = f"http://{HOST}:{PORT}/jupyter/files/"
+
+# Constant endpoint bodies serialized once at import time; returning the
+# prebuilt response makes the handler a single attribute load
+_ROOT_RESPONSE = ORJSONResponse({"message": "Hello and Welcome to the Code Execution API"})
+_HEALTH_RESPONSE = ORJSONResponse({"status": "ok"})
+
 
 tags_metadata = [
     {
@@ -51,10 +64,34 @@ app = FastAPI(
     title="Code Execution API",
     description="API for executing code in a sandboxed environment",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 app.mount("/jupyter/files", StaticFiles(directory=FILES_DIR), name="files")
 jk = JupyterKernels()
+kernel_pool = KernelPool()
+
+# Installed kernelspec names snapshotted once; frozenset membership lets
+# unknown kernels be rejected before a notebook is ever constructed
+KNOWN_KERNELS = frozenset(jk.ks)
+
+
+def _code_response(output=None, error=None, timedout=False, files=None, stacktrace=None) -> ORJSONResponse:
+    """Build an execute_code response body without a Pydantic validation pass.
+
+    The handler constructs the fields itself, so serializing the dict
+    directly skips FastAPI's outbound response_model validation.
+    """
+    return ORJSONResponse({
+        "output": output,
+        "error": error,
+        "timedout": timedout,
+        "files": files,
+        "stacktrace": stacktrace,
+    })
+
+
+UNKNOWN_KERNEL_RESPONSE = _code_response(error="Unknown execution environment; see /jupyter/list_kernel_specs for available kernels")
 
 
 @app.get(
@@ -68,9 +105,9 @@ async def root():
     """Root endpoint that returns a welcome message.
     
     Returns:
-        dict: A dictionary containing a welcome message.
+        ORJSONResponse: A prebuilt response containing a welcome message.
     """
-    return {"message": "Hello and Welcome to the Code Execution API"}
+    return _ROOT_RESPONSE
 
 
 @app.get(
@@ -80,13 +117,13 @@ async def root():
     summary="Check the health of the server",
     description="Returns the health status of the server",
 )
-async def health_check() -> dict[str, str]:
+async def health_check():
     """Check the health status of the server.
     
     Returns:
-        dict[str, str]: A dictionary containing the server status.
+        ORJSONResponse: A prebuilt response containing the server status.
     """
-    return {"status": "ok"}
+    return _HEALTH_RESPONSE
 
 
 @app.put(
@@ -110,22 +147,19 @@ async def upload_file(request: Request, inp: request_classes.FileUpload, user: d
     Raises:
         HTTPException: If an error occurs during file upload.
     """
-    logger.info("#" * 40)
-    logger.info(f"Request to upload file")
-    logger.info(f"Received Request at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info(f"Request Client IP: {request.client.host}")
-    logger.info(f"API Request User: {user}")
-    logger.info("#" * 40)
+    logger.info(BANNER)
+    logger.info("Request to upload file")
+    logger.info("Request Client IP: %s", request.client.host)
+    logger.info("API Request User: %s", user)
+    logger.info(BANNER)
 
     try:
-        uuid = uuid4().hex
-        file_name = f"{inp.filename}-{uuid}.{inp.extension}"
-        safe_file_name = urllib.parse.quote(file_name)
-        file_path = os.path.join("/files", safe_file_name)
-        with open(file_path, "wb") as f:
-            _ = f.write(inp.decoded_content)
+        uuid = secrets.token_hex(16)
+        safe_file_name = f"{inp.safe_filename}-{uuid}.{inp.safe_extension}"
+        disk_path = FILES_DIR + "/" + safe_file_name
+        await run_in_threadpool(write_upload, disk_path, inp.decoded_content)
 
-        return {"url": f"http://{HOST}:{PORT}/jupyter{file_path}"}
+        return {"url": URL_PREFIX + safe_file_name}
 
     except Exception as e:
         # Handle any exceptions that occur during execution
@@ -153,22 +187,115 @@ async def upload_long_life_file(request: Request, inp: request_classes.FileUploa
     Raises:
         HTTPException: If an error occurs during file upload.
     """
-    logger.info("#" * 40)
-    logger.info(f"Request to upload long life file")
-    logger.info(f"Received Request at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info(f"Request Client IP: {request.client.host}")
-    logger.info(f"API Request User: {user}")
-    logger.info("#" * 40)
+    logger.info(BANNER)
+    logger.info("Request to upload long life file")
+    logger.info("Request Client IP: %s", request.client.host)
+    logger.info("API Request User: %s", user)
+    logger.info(BANNER)
 
     try:
-        uuid = uuid4().hex
-        file_name = f"{inp.filename}-long-{uuid}.{inp.extension}"
-        safe_file_name = urllib.parse.quote(file_name)
-        file_path = os.path.join("/files", safe_file_name)
-        with open(file_path, "wb") as f:
-            _ = f.write(inp.decoded_content)
+        uuid = secrets.token_hex(16)
+        safe_file_name = f"{inp.safe_filename}-long-{uuid}.{inp.safe_extension}"
+        disk_path = FILES_DIR + "/" + safe_file_name
+        await run_in_threadpool(write_upload, disk_path, inp.decoded_content)
 
-        return {"url": f"http://{HOST}:{PORT}/jupyter{file_path}"}
+        return {"url": URL_PREFIX + safe_file_name}
+
+    except Exception as e:
+        # Handle any exceptions that occur during execution
+        raise HTTPException(400, {"error": f"An error occurred: {str(e)}", "stacktrace": traceback.format_exc()})
+
+
+@app.put(
+    "/jupyter/files/raw",
+    tags=["File Management"],
+    operation_id="upload_file_raw",
+    summary="Upload a raw binary file to the server",
+    description="Uploads the raw request body to the server and returns the URL of the uploaded file. The file lives for 20 minutes.",
+)
+async def upload_file_raw(request: Request, filename: str, extension: str, user: dict=Depends(get_user)) -> dict:
+    """Upload a raw binary request body to the server.
+
+    Unlike the base64 endpoint, the body is streamed straight to disk in
+    chunks, so large files are never base64-inflated or buffered in memory.
+
+    Args:
+        request (Request): The FastAPI request object; its body is the file content.
+        filename (str): Name of the file without extension.
+        extension (str): File extension without the leading dot.
+        user (dict, optional): The authenticated user information. Defaults to Depends(get_user).
+
+    Returns:
+        dict: A dictionary containing the URL of the uploaded file.
+
+    Raises:
+        HTTPException: If an error occurs during file upload.
+    """
+    logger.info(BANNER)
+    logger.info("Request to upload raw file")
+    logger.info("Request Client IP: %s", request.client.host)
+    logger.info("API Request User: %s", user)
+    logger.info(BANNER)
+
+    try:
+        uuid = secrets.token_hex(16)
+        # Quote each client-supplied part with safe="" so path separators
+        # cannot escape FILES_DIR; the token is known-ASCII
+        safe_file_name = f"{urllib.parse.quote(filename, safe='')}-{uuid}.{urllib.parse.quote(extension, safe='')}"
+        disk_path = FILES_DIR + "/" + safe_file_name
+        async with aiofiles.open(disk_path, "wb") as f:
+            async for chunk in request.stream():
+                await f.write(chunk)
+
+        return {"url": URL_PREFIX + safe_file_name}
+
+    except Exception as e:
+        # Handle any exceptions that occur during execution
+        raise HTTPException(400, {"error": f"An error occurred: {str(e)}", "stacktrace": traceback.format_exc()})
+
+
+@app.put(
+    "/jupyter/files/raw/long-lifetime",
+    tags=["File Management"],
+    operation_id="upload_long_life_file_raw",
+    summary="Upload a raw binary file with extended lifetime to the server",
+    description="Uploads the raw request body to the server and returns the URL of the uploaded file. The file lives for 2 days.",
+)
+async def upload_long_life_file_raw(request: Request, filename: str, extension: str, user: dict=Depends(get_user)) -> dict:
+    """Upload a raw binary request body with extended lifetime to the server.
+
+    Unlike the base64 endpoint, the body is streamed straight to disk in
+    chunks, so large files are never base64-inflated or buffered in memory.
+
+    Args:
+        request (Request): The FastAPI request object; its body is the file content.
+        filename (str): Name of the file without extension.
+        extension (str): File extension without the leading dot.
+        user (dict, optional): The authenticated user information. Defaults to Depends(get_user).
+
+    Returns:
+        dict: A dictionary containing the URL of the uploaded file.
+
+    Raises:
+        HTTPException: If an error occurs during file upload.
+    """
+    logger.info(BANNER)
+    logger.info("Request to upload raw long life file")
+    logger.info("Request Client IP: %s", request.client.host)
+    logger.info("API Request User: %s", user)
+    logger.info(BANNER)
+
+    try:
+        uuid = secrets.token_hex(16)
+        # Quote each client-supplied part with safe="" so path separators
+        # cannot escape FILES_DIR; the token is known-ASCII
+        safe_file_name = f"{urllib.parse.quote(filename, safe='')}-long-{uuid}.{urllib.parse.quote(extension, safe='')}"
+        disk_path = FILES_DIR + "/" + safe_file_name
+        async with aiofiles.open(disk_path, "wb") as f:
+            async for chunk in request.stream():
+                await f.write(chunk)
+
+        return {"url": URL_PREFIX + safe_file_name}
 
     except Exception as e:
         # Handle any exceptions that occur during execution
@@ -192,17 +319,19 @@ async def list_kernel_specs(request: Request, user: dict=Depends(get_user)) -> d
     Returns:
         dict: A dictionary containing available kernel specifications or error information.
     """
-    logger.info("#" * 40)
-    logger.info(f"Request for available kernels")
-    logger.info(f"Received Request at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info(f"Request Client IP: {request.client.host}")
-    logger.info(f"API Request User: {user}")
-    logger.info("#" * 40)
+    logger.info(BANNER)
+    logger.info("Request for available kernels")
+    logger.info("Request Client IP: %s", request.client.host)
+    logger.info("API Request User: %s", user)
+    logger.info(BANNER)
     try:
-        envs = jk.ks
-        envs = {k: v for k, v in envs.items() if k != "python3"}
+        # Kernel specs are effectively static: answer matching conditional
+        # requests with a bodyless 304
+        etag = jk.ks_public_etag
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
 
-        return envs
+        return ORJSONResponse(jk.ks_public, headers={"ETag": etag})
 
     except Exception as e:
         # Handle any exceptions that occur during execution
@@ -212,12 +341,12 @@ async def list_kernel_specs(request: Request, user: dict=Depends(get_user)) -> d
 @app.post(
     "/jupyter/execute",
     tags=["Code Execution"],
-    response_model=request_classes.CodeResponse,
+    response_model=None,
     operation_id="execute_code",
     summary="Execute code in a sandboxed environment",
     description="Executes code in a sandboxed environment and returns the output, errors, files, etc."
 )
-async def execute_code(request: Request, inp: request_classes.CodeRequest, user: dict=Depends(get_user)) -> request_classes.CodeResponse:
+async def execute_code(request: Request, inp: request_classes.CodeRequest, user: dict=Depends(get_user)) -> ORJSONResponse:
     """Execute code in a Jupyter kernel.
     
     Args:
@@ -226,116 +355,71 @@ async def execute_code(request: Request, inp: request_classes.CodeRequest, user:
         user (dict, optional): The authenticated user information. Defaults to Depends(get_user).
     
     Returns:
-        request_classes.CodeResponse: The execution response containing output, errors, files, etc.
+        ORJSONResponse: The execution response containing output, errors, files, etc.
     """
-    logger.info("#" * 40)
-    logger.info(f"Request to execute code")
-    logger.info(f"Received Request at {inp.request_date}")
-    logger.info(f"API Request User: {user}")
-    logger.info(f"Request User: {inp.user}")
-    logger.info(f"Request Client IP: {request.client.host}")
-    logger.info(f"Request ID: {inp.request_id}")
-    logger.info(f"Execution environment: {inp.execution_environment}")
-    logger.info(f"Execution Timeout: {inp.timeout}")
-    logger.info("#" * 40)
-
-    cwd = os.getcwd()
+    logger.info(BANNER)
+    logger.info("Request to execute code")
+    logger.info("API Request User: %s", user)
+    logger.info("Request User: %s", inp.user)
+    logger.info("Request Client IP: %s", request.client.host)
+    logger.info("Request ID: %s", inp.request_id)
+    logger.info("Execution environment: %s", inp.execution_environment)
+    logger.info("Execution Timeout: %s", inp.timeout)
+    logger.info(BANNER)
 
     try:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            os.chdir(tmpdir)
-            logger.info(f"Running code in tempdir: {tmpdir}")
-
-            code_blob = inp.code
-            timeout = inp.timeout
-            kernel_name = inp.execution_environment
-
-            # If base environment is used then raise an exception
-            if kernel_name == 'python3':
-                return request_classes.CodeResponse(
-                    output=None,
-                    error="Base environment is not supported for code execution",
-                    timedout=False,
-                    files=None,
-                    stacktrace=None
-                )
-
-            if code_blob != "":
-                install_packages = inp.packages
-                nb = JupyterNotebook(kernel_name=kernel_name)
+        code_blob = inp.code
+        timeout = inp.timeout
+        kernel_name = inp.execution_environment
+
+        # If base environment is used then raise an exception
+        if kernel_name == 'python3':
+            return _code_response(error="Base environment is not supported for code execution")
+
+        if kernel_name not in KNOWN_KERNELS:
+            return UNKNOWN_KERNEL_RESPONSE
+
+        if code_blob != "":
+            install_packages = inp.packages
+            nb = await kernel_pool.acquire(kernel_name)
+            try:
                 if install_packages:
-                    if 'python' in kernel_name.lower():
-                        logger.info("Installing additional python packages")
-                        pkg_resp = nb.install_python_packages(install_packages, timeout=timeout)
-                        if pkg_resp:
-                            return request_classes.CodeResponse(
-                                output=None,
-                                error=pkg_resp[0],
-                                timedout=pkg_resp[1],
-                                files=None,
-                                stacktrace=pkg_resp[2]
-                            )
-                    elif 'javascript' in kernel_name.lower():
-                        logger.info("Installing additional javascript packages")
-                        pkg_resp = nb.install_npm_packages(install_packages, timeout=timeout)
-                        if pkg_resp:
-                            return request_classes.CodeResponse(
-                                output=None,
-                                error=pkg_resp[0],
-                                timedout=pkg_resp[1],
-                                files=None,
-                                stacktrace=pkg_resp[2]
-                            )
-                    else:
-                        return request_classes.CodeResponse(
-                            output=None,
-                            error=f"Installations of additional packages is not supported for kernel {kernel_name}",
-                            timedout=False,
-                            files=None,
-                            stacktrace=None
-                        )
+                    installer = INSTALLERS.get(nb.family)
+                    if installer is None:
+                        return _code_response(error=f"Installations of additional packages is not supported for kernel {kernel_name}")
+                    logger.info("Installing additional %s packages", nb.family)
+                    pkg_resp = await run_in_threadpool(installer, nb, install_packages, timeout=timeout)
+                    if pkg_resp:
+                        return _code_response(error=pkg_resp[0], timedout=pkg_resp[1], stacktrace=pkg_resp[2])
 
                 logger.info("Running code")
-                out, error, files, timedout = nb.run_cell(code_blob, timeout)
+                out, error, files, timedout = await run_in_threadpool(nb.run_cell, code_blob, timeout)
 
                 if files:
-                    file_urls = []
+                    _tok = secrets.token_hex
+                    out_names = []
+                    copies = []
                     for file in files:
-                        file_path = f"/files/{'.'.join(file['file'].split('.')[:-1])}-{uuid4().hex}.{file['file'].split('.')[-1]}"
-                        with open(file_path, "wb") as f:
-                            _ = f.write(base64.b64decode(file['content'].encode()))
-                        file_urls.append({"filename": file['file'],
-                                      "url": f"http://{HOST}:{PORT}/jupyter{file_path}"})
-
-                return request_classes.CodeResponse(
-                    output=out,
-                    error=error,
-                    timedout=timedout,
-                    files=file_urls if files else None,
-                    stacktrace=None
-                )
-
-        return request_classes.CodeResponse(
-            output=None,
-            error="No code provided to run",
-            timedout=False,
-            files=None,
-            stacktrace=None
-        )
+                        stem, ext = os.path.splitext(file['file'])
+                        out_name = f"{stem}-{_tok(16)}{ext}"
+                        out_names.append(out_name)
+                        copies.append(run_in_threadpool(copy_result_file, file['path'], FILES_DIR + "/" + out_name))
+                    # The copies are sendfile-bound, so fanning them across
+                    # the threadpool overlaps the per-file syscall time
+                    await asyncio.gather(*copies)
+                    file_urls = [{"filename": file['file'],
+                                  "url": URL_PREFIX + out_name}
+                                 for file, out_name in zip(files, out_names)]
+
+                return _code_response(output=out, error=error, timedout=timedout, files=file_urls if files else None)
+            finally:
+                await kernel_pool.release(nb)
+
+        return _code_response(error="No code provided to run")
 
     except Exception as e:
         # Handle any exceptions that occur during execution
-        return request_classes.CodeResponse(
-            output=None,
-            error=f"An error occurred: {str(e)}",
-            timedout=False,
-            files=None,
-            stacktrace=traceback.format_exc()
-        )
-
-    finally:
-        os.chdir(cwd)
-        logger.info(f"Returning to original directory: {cwd}")
+        return _code_response(error=f"An error occurred: {str(e)}", stacktrace=traceback.format_exc())
 
 
 # Initialize FastAPI-MCP
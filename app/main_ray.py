@@ -1,21 +1,22 @@
 import os
+import asyncio
+import signal
 import urllib.parse
-import time
-import base64
-from uuid import uuid4
-import tempfile
+import secrets
 import traceback
+import aiofiles
 import ray
 from ray import serve
-from datetime import datetime
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request, Depends, HTTPException
+from fastapi import FastAPI, Request, Response, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from code_server.utils import logger_setup
 from code_server.utils.auth import get_user
-from code_server.utils.file_utils import lifespan, FILES_DIR
+from code_server.utils.file_utils import lifespan, copy_result_file, write_upload, FILES_DIR
 from code_server.classes import request_classes
-from code_server.jupyter.JupyterClient import JupyterNotebook, JupyterKernels
+from code_server.jupyter.JupyterClient import JupyterKernels, KernelPool, INSTALLERS
 
 
 logger_setup.configure_logging()
@@ -29,6 +30,36 @@ load_dotenv()
 HOST = "127.0.0.1"
 PORT = "8080"
 
+# Log banner built once instead of per request
+BANNER = "#" * 40
+
+# Public URL prefix for served files, built once; per-file URLs become a
+# single string concatenation instead of an f-string over four parts
+URL_PREFIX = f"http://{HOST}:{PORT}/jupyter/files/"
+
+# Constant endpoint bodies serialized once at import time; returning the
+# prebuilt response makes the handler a single attribute load
+_ROOT_RESPONSE = ORJSONResponse({"message": "Hello and Welcome to the Code Execution API"})
+_HEALTH_RESPONSE = ORJSONResponse({"status": "ok"})
+
+
+def _code_response(output=None, error=None, timedout=False, files=None, stacktrace=None) -> ORJSONResponse:
+    """Build an execute_code response body without a Pydantic validation pass.
+
+    The handler constructs the fields itself, so serializing the dict
+    directly skips FastAPI's outbound response_model validation.
+    """
+    return ORJSONResponse({
+        "output": output,
+        "error": error,
+        "timedout": timedout,
+        "files": files,
+        "stacktrace": stacktrace,
+    })
+
+
+UNKNOWN_KERNEL_RESPONSE = _code_response(error="Unknown execution environment; see /jupyter/list_kernel_specs for available kernels")
+
 
 tags_metadata = [
     {
@@ -63,7 +94,7 @@ ray.init(
 serve.start(detached=False, http_options={"host": "0.0.0.0", "port": 8080})
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.mount("/files", StaticFiles(directory=FILES_DIR), name="files")
 
 
@@ -84,24 +115,29 @@ class FastAPIDeployment:
         """Initialize the FastAPI deployment with Jupyter kernels."""
         logger.info("Initializing FastAPI Deployment")
         self.jk = JupyterKernels()
+        self.kernel_pool = KernelPool()
+        # Installed kernelspec names snapshotted once; frozenset membership
+        # lets unknown kernels be rejected before a notebook is ever
+        # constructed
+        self.known_kernels = frozenset(self.jk.ks)
 
     @app.get("/")
     async def root(self):
         """Root endpoint that returns a welcome message.
         
         Returns:
-            dict: A dictionary containing a welcome message.
+            ORJSONResponse: A prebuilt response containing a welcome message.
         """
-        return {"message": "Hello and Welcome to the Code Execution API"}
+        return _ROOT_RESPONSE
 
     @app.get("/health", tags=["Health Check"])
-    async def health_check(self) -> dict[str, str]:
+    async def health_check(self):
         """Check the health status of the server.
         
         Returns:
-            dict[str, str]: A dictionary containing the server status.
+            ORJSONResponse: A prebuilt response containing the server status.
         """
-        return {"status": "ok"}
+        return _HEALTH_RESPONSE
 
     @app.put("/files", tags=["File Management"])
     async def upload_file(self, request: Request, inp: request_classes.FileUpload, user: dict=Depends(get_user)) -> dict:
@@ -118,22 +154,19 @@ class FastAPIDeployment:
         Raises:
             HTTPException: If an error occurs during file upload.
         """
-        logger.info("#" * 40)
-        logger.info(f"Request to upload file")
-        logger.info(f"Received Request at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        logger.info(f"Request Client IP: {request.client.host}")
-        logger.info(f"API Request User: {user}")
-        logger.info("#" * 40)
+        logger.info(BANNER)
+        logger.info("Request to upload file")
+        logger.info("Request Client IP: %s", request.client.host)
+        logger.info("API Request User: %s", user)
+        logger.info(BANNER)
 
         try:
-            uuid = uuid4().hex
-            file_name = f"{inp.filename}-{uuid}.{inp.extension}"
-            safe_file_name = urllib.parse.quote(file_name)
-            file_path = os.path.join("/files", safe_file_name)
-            with open(file_path, "wb") as f:
-                _ = f.write(inp.decoded_content)
+            uuid = secrets.token_hex(16)
+            safe_file_name = f"{inp.safe_filename}-{uuid}.{inp.safe_extension}"
+            disk_path = FILES_DIR + "/" + safe_file_name
+            await run_in_threadpool(write_upload, disk_path, inp.decoded_content)
 
-            return {"url": f"http://{HOST}:{PORT}/jupyter{file_path}"}
+            return {"url": URL_PREFIX + safe_file_name}
 
         except Exception as e:
             # Handle any exceptions that occur during execution
@@ -154,22 +187,101 @@ class FastAPIDeployment:
         Raises:
             HTTPException: If an error occurs during file upload.
         """
-        logger.info("#" * 40)
-        logger.info(f"Request to upload long life file")
-        logger.info(f"Received Request at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        logger.info(f"Request Client IP: {request.client.host}")
-        logger.info(f"API Request User: {user}")
-        logger.info("#" * 40)
+        logger.info(BANNER)
+        logger.info("Request to upload long life file")
+        logger.info("Request Client IP: %s", request.client.host)
+        logger.info("API Request User: %s", user)
+        logger.info(BANNER)
+
+        try:
+            uuid = secrets.token_hex(16)
+            safe_file_name = f"{inp.safe_filename}-long-{uuid}.{inp.safe_extension}"
+            disk_path = FILES_DIR + "/" + safe_file_name
+            await run_in_threadpool(write_upload, disk_path, inp.decoded_content)
+
+            return {"url": URL_PREFIX + safe_file_name}
+
+        except Exception as e:
+            # Handle any exceptions that occur during execution
+            raise HTTPException(400, {"error": f"An error occurred: {str(e)}", "stacktrace": traceback.format_exc()})
+
+    @app.put("/files/raw", tags=["File Management"])
+    async def upload_file_raw(self, request: Request, filename: str, extension: str, user: dict=Depends(get_user)) -> dict:
+        """Upload a raw binary request body to the server.
+
+        Unlike the base64 endpoint, the body is streamed straight to disk in
+        chunks, so large files are never base64-inflated or buffered in memory.
+
+        Args:
+            request (Request): The FastAPI request object; its body is the file content.
+            filename (str): Name of the file without extension.
+            extension (str): File extension without the leading dot.
+            user (dict, optional): The authenticated user information. Defaults to Depends(get_user).
+
+        Returns:
+            dict: A dictionary containing the URL of the uploaded file.
+
+        Raises:
+            HTTPException: If an error occurs during file upload.
+        """
+        logger.info(BANNER)
+        logger.info("Request to upload raw file")
+        logger.info("Request Client IP: %s", request.client.host)
+        logger.info("API Request User: %s", user)
+        logger.info(BANNER)
 
         try:
-            uuid = uuid4().hex
-            file_name = f"{inp.filename}-long-{uuid}.{inp.extension}"
-            safe_file_name = urllib.parse.quote(file_name)
-            file_path = os.path.join("/files", safe_file_name)
-            with open(file_path, "wb") as f:
-                _ = f.write(inp.decoded_content)
+            uuid = secrets.token_hex(16)
+            # Quote each client-supplied part with safe="" so path separators
+            # cannot escape FILES_DIR; the token is known-ASCII
+            safe_file_name = f"{urllib.parse.quote(filename, safe='')}-{uuid}.{urllib.parse.quote(extension, safe='')}"
+            disk_path = FILES_DIR + "/" + safe_file_name
+            async with aiofiles.open(disk_path, "wb") as f:
+                async for chunk in request.stream():
+                    await f.write(chunk)
 
-            return {"url": f"http://{HOST}:{PORT}/jupyter{file_path}"}
+            return {"url": URL_PREFIX + safe_file_name}
+
+        except Exception as e:
+            # Handle any exceptions that occur during execution
+            raise HTTPException(400, {"error": f"An error occurred: {str(e)}", "stacktrace": traceback.format_exc()})
+
+    @app.put("/files/raw/long-lifetime", tags=["File Management"])
+    async def upload_long_life_file_raw(self, request: Request, filename: str, extension: str, user: dict=Depends(get_user)) -> dict:
+        """Upload a raw binary request body with extended lifetime to the server.
+
+        Unlike the base64 endpoint, the body is streamed straight to disk in
+        chunks, so large files are never base64-inflated or buffered in memory.
+
+        Args:
+            request (Request): The FastAPI request object; its body is the file content.
+            filename (str): Name of the file without extension.
+            extension (str): File extension without the leading dot.
+            user (dict, optional): The authenticated user information. Defaults to Depends(get_user).
+
+        Returns:
+            dict: A dictionary containing the URL of the uploaded file.
+
+        Raises:
+            HTTPException: If an error occurs during file upload.
+        """
+        logger.info(BANNER)
+        logger.info("Request to upload raw long life file")
+        logger.info("Request Client IP: %s", request.client.host)
+        logger.info("API Request User: %s", user)
+        logger.info(BANNER)
+
+        try:
+            uuid = secrets.token_hex(16)
+            # Quote each client-supplied part with safe="" so path separators
+            # cannot escape FILES_DIR; the token is known-ASCII
+            safe_file_name = f"{urllib.parse.quote(filename, safe='')}-long-{uuid}.{urllib.parse.quote(extension, safe='')}"
+            disk_path = FILES_DIR + "/" + safe_file_name
+            async with aiofiles.open(disk_path, "wb") as f:
+                async for chunk in request.stream():
+                    await f.write(chunk)
+
+            return {"url": URL_PREFIX + safe_file_name}
 
         except Exception as e:
             # Handle any exceptions that occur during execution
@@ -186,24 +298,26 @@ class FastAPIDeployment:
         Returns:
             dict: A dictionary containing available kernel specifications or error information.
         """
-        logger.info("#" * 40)
-        logger.info(f"Request for available kernels")
-        logger.info(f"Received Request at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        logger.info(f"Request Client IP: {request.client.host}")
-        logger.info(f"API Request User: {user}")
-        logger.info("#" * 40)
+        logger.info(BANNER)
+        logger.info("Request for available kernels")
+        logger.info("Request Client IP: %s", request.client.host)
+        logger.info("API Request User: %s", user)
+        logger.info(BANNER)
         try:
-            envs = self.jk.ks
-            envs = {k: v for k, v in envs.items() if k != "python3"}
+            # Kernel specs are effectively static: answer matching conditional
+            # requests with a bodyless 304
+            etag = self.jk.ks_public_etag
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers={"ETag": etag})
 
-            return envs
+            return ORJSONResponse(self.jk.ks_public, headers={"ETag": etag})
 
         except Exception as e:
             # Handle any exceptions that occur during execution
             return {"error": f"An error occurred: {str(e)}", "stacktrace": traceback.format_exc()}
 
     @app.post("/execute", tags=["Code Execution"])
-    async def execute_code(self, request: Request, inp: request_classes.CodeRequest, user: dict=Depends(get_user)) -> request_classes.CodeResponse | None:
+    async def execute_code(self, request: Request, inp: request_classes.CodeRequest, user: dict=Depends(get_user)) -> ORJSONResponse:
         """Execute code in a Jupyter kernel.
         
         Args:
@@ -212,128 +326,89 @@ class FastAPIDeployment:
             user (dict, optional): The authenticated user information. Defaults to Depends(get_user).
         
         Returns:
-            request_classes.CodeResponse | None: The execution response containing output, errors, files, etc.
+            ORJSONResponse: The execution response containing output, errors, files, etc.
         """
-        logger.info("#" * 40)
-        logger.info(f"Request to execute code")
-        logger.info(f"Received Request at {inp.request_date}")
-        logger.info(f"API Request User: {user}")
-        logger.info(f"Request User: {inp.user}")
-        logger.info(f"Request Client IP: {request.client.host}")
-        logger.info(f"Request ID: {inp.request_id}")
-        logger.info(f"Execution environment: {inp.execution_environment}")
-        logger.info(f"Execution Timeout: {inp.timeout}")
-        logger.info("#" * 40)
-
-        cwd = os.getcwd()
+        logger.info(BANNER)
+        logger.info("Request to execute code")
+        logger.info("API Request User: %s", user)
+        logger.info("Request User: %s", inp.user)
+        logger.info("Request Client IP: %s", request.client.host)
+        logger.info("Request ID: %s", inp.request_id)
+        logger.info("Execution environment: %s", inp.execution_environment)
+        logger.info("Execution Timeout: %s", inp.timeout)
+        logger.info(BANNER)
 
         try:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                os.chdir(tmpdir)
-                logger.info(f"Running code in tempdir: {tmpdir}")
-
-                code_blob = inp.code
-                timeout = inp.timeout
-                kernel_name = inp.execution_environment
-
-                # If base environment is used then raise an exception
-                if kernel_name == 'python3':
-                    return request_classes.CodeResponse(
-                        output=None,
-                        error="Base environment is not supported for code execution",
-                        timedout=False,
-                        files=None,
-                        stacktrace=None
-                    )
-
-                if code_blob != "":
-                    install_packages = inp.packages
-                    nb = JupyterNotebook(kernel_name=kernel_name)
+            code_blob = inp.code
+            timeout = inp.timeout
+            kernel_name = inp.execution_environment
+
+            # If base environment is used then raise an exception
+            if kernel_name == 'python3':
+                return _code_response(error="Base environment is not supported for code execution")
+
+            if kernel_name not in self.known_kernels:
+                return UNKNOWN_KERNEL_RESPONSE
+
+            if code_blob != "":
+                install_packages = inp.packages
+                nb = await self.kernel_pool.acquire(kernel_name)
+                try:
                     if install_packages:
-                        if 'python' in kernel_name.lower():
-                            logger.info("Installing additional python packages")
-                            pkg_resp = nb.install_python_packages(install_packages, timeout=timeout)
-                            if pkg_resp:
-                                return request_classes.CodeResponse(
-                                    output=None,
-                                    error=pkg_resp[0],
-                                    timedout=pkg_resp[1],
-                                    files=None,
-                                    stacktrace=pkg_resp[2]
-                                )
-                        elif 'javascript' in kernel_name.lower():
-                            logger.info("Installing additional javascript packages")
-                            pkg_resp = nb.install_npm_packages(install_packages, timeout=timeout)
-                            if pkg_resp:
-                                return request_classes.CodeResponse(
-                                    output=None,
-                                    error=pkg_resp[0],
-                                    timedout=pkg_resp[1],
-                                    files=None,
-                                    stacktrace=pkg_resp[2]
-                                )
-                        else:
-                            return request_classes.CodeResponse(
-                                output=None,
-                                error=f"Installations of additional packages is not supported for kernel {kernel_name}",
-                                timedout=False,
-                                files=None,
-                                stacktrace=None
-                            )
+                        installer = INSTALLERS.get(nb.family)
+                        if installer is None:
+                            return _code_response(error=f"Installations of additional packages is not supported for kernel {kernel_name}")
+                        logger.info("Installing additional %s packages", nb.family)
+                        pkg_resp = await run_in_threadpool(installer, nb, install_packages, timeout=timeout)
+                        if pkg_resp:
+                            return _code_response(error=pkg_resp[0], timedout=pkg_resp[1], stacktrace=pkg_resp[2])
 
                     logger.info("Running code")
-                    out, error, files, timedout = nb.run_cell(code_blob, timeout)
+                    out, error, files, timedout = await run_in_threadpool(nb.run_cell, code_blob, timeout)
 
                     if files:
-                        file_urls = []
+                        _tok = secrets.token_hex
+                        out_names = []
+                        copies = []
                         for file in files:
-                            file_path = f"/files/{'.'.join(file['file'].split('.')[:-1])}-{uuid4().hex}.{file['file'].split('.')[-1]}"
-                            with open(file_path, "wb") as f:
-                                _ = f.write(base64.b64decode(file['content'].encode()))
-                            file_urls.append({"filename": file['file'],"url": f"http://{HOST}:{PORT}/jupyter{file_path}"})
-
-                    return request_classes.CodeResponse(
-                        output=out,
-                        error=error,
-                        timedout=timedout,
-                        files=file_urls if files else None,
-                        stacktrace=None
-                    )
+                            stem, ext = os.path.splitext(file['file'])
+                            out_name = f"{stem}-{_tok(16)}{ext}"
+                            out_names.append(out_name)
+                            copies.append(run_in_threadpool(copy_result_file, file['path'], FILES_DIR + "/" + out_name))
+                        # The copies are sendfile-bound, so fanning them across
+                        # the threadpool overlaps the per-file syscall time
+                        await asyncio.gather(*copies)
+                        file_urls = [{"filename": file['file'], "url": URL_PREFIX + out_name}
+                                     for file, out_name in zip(files, out_names)]
+
+                    return _code_response(output=out, error=error, timedout=timedout, files=file_urls if files else None)
+                finally:
+                    await self.kernel_pool.release(nb)
 
             # java? https://github.com/SpencerPark/IJava
             # bash script? https://pypi.org/project/bash_kernel/
 
-            return request_classes.CodeResponse(
-                output=None,
-                error="No code provided to run",
-                timedout=False,
-                files=None,
-                stacktrace=None
-            )
+            return _code_response(error="No code provided to run")
 
         except Exception as e:
             # Handle any exceptions that occur during execution
-            return request_classes.CodeResponse(
-                output=None,
-                error=f"An error occurred: {str(e)}",
-                timedout=False,
-                files=None,
-                stacktrace=traceback.format_exc()
-            )
-
-        finally:
-            os.chdir(cwd)
-            logger.info(f"Returning to original directory: {cwd}")
+            return _code_response(error=f"An error occurred: {str(e)}", stacktrace=traceback.format_exc())
 
 
 serve.run(FastAPIDeployment.bind(), route_prefix="/jupyter")
 
 
-try:
-    while True:
-        time.sleep(1200)
-except KeyboardInterrupt:
+def _shutdown(signum, frame):
+    """Tear down Serve and Ray on SIGINT/SIGTERM and exit."""
     ray.shutdown()
     serve.shutdown()
     print("Exiting...")
-    exit()
\ No newline at end of file
+    os._exit(0)
+
+
+signal.signal(signal.SIGINT, _shutdown)
+signal.signal(signal.SIGTERM, _shutdown)
+
+# Sleep until a signal arrives instead of waking every 20 minutes; shutdown
+# now reacts to SIGTERM immediately rather than on the next sleep tick
+signal.pause()
\ No newline at end of file